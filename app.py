@@ -1,7 +1,8 @@
-import os, time, random, requests, sqlite3
+import os, time, random, requests, sqlite3, threading, logging, functools, statistics
 from flask import Flask, render_template, request, redirect, url_for, flash, session, g
 from werkzeug.security import generate_password_hash, check_password_hash
 import math
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from google import genai
 import json
 
@@ -16,11 +17,24 @@ if USE_DATABRICKS:
 app = Flask(__name__)
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "dev_only__change_me")
 app_name = "PathWise"
+# Without this app.logger sits at WARNING outside debug and drops INFO lines
+_log_level = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO").upper())
+app.logger.setLevel(_log_level if isinstance(_log_level, int) else logging.INFO)
 
 # --- External APIs
 SCORECARD_KEY  = os.getenv("SCORECARD_API_KEY")
 SCORECARD_BASE = "https://api.data.gov/ed/collegescorecard/v1/schools"
 
+# --- Password hashing
+# Werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000".
+# Benchmark candidates on the target box with `flask --app app bench-hash`.
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+# Cap concurrent hash checks so a login spike can't eat every CPU
+LOGIN_HASH_WORKERS   = int(os.getenv("LOGIN_HASH_WORKERS", "2"))
+LOGIN_HASH_TIMEOUT   = float(os.getenv("LOGIN_HASH_TIMEOUT", "10"))
+# Checks allowed to wait behind the workers before new ones are turned away
+LOGIN_HASH_QUEUE     = int(os.getenv("LOGIN_HASH_QUEUE", "8"))
+
 # --- Local SQLite fallback (dev)
 SQLITE_DB = "database.db"
 
@@ -136,6 +150,81 @@ def create_tables():
             )
         """)
 
+# ========== PASSWORD HELPERS ==========
+_hash_pool  = ThreadPoolExecutor(max_workers=LOGIN_HASH_WORKERS, thread_name_prefix="pwhash")
+_hash_slots = threading.BoundedSemaphore(LOGIN_HASH_WORKERS + LOGIN_HASH_QUEUE)
+
+def hash_password(password: str) -> str:
+    return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+
+def _hash_params(pwhash: str) -> str:
+    # Werkzeug stores "method$salt$hash"; the method part carries the cost
+    return pwhash.split("$", 1)[0]
+
+@functools.cache
+def current_hash_params() -> str:
+    """Normalized form of the configured method ("scrypt" -> "scrypt:32768:8:1")."""
+    return _hash_params(hash_password(""))
+
+def needs_rehash(pwhash: str) -> bool:
+    return _hash_params(pwhash) != current_hash_params()
+
+def _timed(fn, submitted: float, *args):
+    started = time.perf_counter()
+    out = fn(*args)
+    return out, started - submitted, time.perf_counter() - started
+
+def run_hash_job(fn, *args):
+    """
+    Run fn(*args) on the bounded hash pool.
+    Returns (result, queue_seconds, hash_seconds). Raises FutureTimeout when
+    the queue is full or the job doesn't finish within LOGIN_HASH_TIMEOUT;
+    a job that hasn't started yet is cancelled so retries don't pile up.
+    """
+    if not _hash_slots.acquire(blocking=False):
+        raise FutureTimeout("hash queue full")
+    try:
+        future = _hash_pool.submit(_timed, fn, time.perf_counter(), *args)
+    except Exception:
+        _hash_slots.release()
+        raise
+    # Slot frees when the job finishes or is cancelled
+    future.add_done_callback(lambda f: _hash_slots.release())
+    try:
+        return future.result(timeout=LOGIN_HASH_TIMEOUT)
+    except FutureTimeout:
+        future.cancel()
+        raise
+
+def verify_password(pwhash: str, password: str):
+    """Check a password on the hash pool. Returns (ok, queue_seconds, hash_seconds)."""
+    return run_hash_job(check_password_hash, pwhash, password)
+
+@app.cli.command("bench-hash")
+def bench_hash():
+    """Time password checks for candidate methods, LOGIN_HASH_WORKERS at a time."""
+    candidates = [
+        PASSWORD_HASH_METHOD,
+        "scrypt:16384:8:1",
+        "scrypt:32768:8:1",
+        "scrypt:65536:8:1",
+        "pbkdf2:sha256:600000",
+        "pbkdf2:sha256:1000000",
+    ]
+    burst = LOGIN_HASH_WORKERS * 10
+    print(f"{burst} checks per method submitted at once to {LOGIN_HASH_WORKERS} worker(s)")
+    for method in dict.fromkeys(candidates):
+        pwhash = generate_password_hash("benchmark-password", method=method)
+        submitted = time.perf_counter()
+        futures = [_hash_pool.submit(_timed, check_password_hash, submitted, pwhash, "benchmark-password")
+                   for _ in range(burst)]
+        results = [f.result() for f in futures]
+        hash_ms  = [r[2] * 1000 for r in results]
+        total_ms = [(r[1] + r[2]) * 1000 for r in results]
+        print(f"{method:<24} hash median {statistics.median(hash_ms):7.1f} ms   "
+              f"wait+hash median {statistics.median(total_ms):7.1f} ms   "
+              f"slowest of {burst} {max(total_ms):7.1f} ms")
+
 # ========== SCORECARD HELPERS ==========
 # NOTE: request fewer fields => faster and fewer failures
 SCORECARD_FIELDS = ",".join([
@@ -313,8 +402,13 @@ def register_step1():
     if request.method == "POST":
         email = request.form["email"].strip()
         password = request.form["password"]
+        try:
+            pwhash, _, _ = run_hash_job(hash_password, password)
+        except FutureTimeout:
+            flash("Sign-up is busy right now. Please try again.")
+            return redirect(url_for("register_step1"))
         session["new_user_email"] = email
-        session["new_user_password"] = generate_password_hash(password)
+        session["new_user_password"] = pwhash
         return redirect(url_for("register_step2"))
     return render_template("register_step1.html", app_name=app_name)
 
@@ -371,7 +465,25 @@ def login():
 
     user = exec_query(f"SELECT * FROM {TB_USERS} WHERE email = :email", {"email": email}, one=True)
 
-    if user and check_password_hash(user["password"], password):
+    ok = False
+    if user:
+        try:
+            ok, waited, elapsed = verify_password(user["password"], password)
+        except FutureTimeout:
+            flash("Login is busy right now. Please try again.")
+            return redirect(url_for("index"))
+        app.logger.info("login hash check: wait %.1f ms, hash %.1f ms (%s)",
+                        waited * 1000, elapsed * 1000, _hash_params(user["password"]))
+
+    if ok:
+        # Upgrade stored hash if the configured cost has changed; skip if the pool is busy
+        if needs_rehash(user["password"]):
+            try:
+                new_hash, _, _ = run_hash_job(hash_password, password)
+                exec_nonquery(f"UPDATE {TB_USERS} SET password = :password WHERE id = :uid",
+                              {"password": new_hash, "uid": user["id"]})
+            except FutureTimeout:
+                app.logger.info("login rehash skipped for user %s: hash pool busy", user["id"])
         session["user_id"] = user["id"]
         flash("Logged in successfully.")
         return redirect(url_for("dashboard"))
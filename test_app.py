@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+import app as pathwise
+
+OLD_METHOD = "pbkdf2:sha256:1000"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(pathwise, "SQLITE_DB", str(tmp_path / "test.db"))
+    pathwise.app.config["TESTING"] = True
+    with pathwise.app.app_context():
+        pathwise.create_tables()
+    return pathwise.app.test_client()
+
+
+def add_user(email, pwhash):
+    with pathwise.app.app_context():
+        pathwise.exec_nonquery(
+            f"INSERT INTO {pathwise.TB_USERS} (email, password, major) VALUES (:email, :password, 'undecided')",
+            {"email": email, "password": pwhash},
+        )
+
+
+def stored_hash(email):
+    with pathwise.app.app_context():
+        row = pathwise.exec_query(f"SELECT password FROM {pathwise.TB_USERS} WHERE email = :email",
+                                  {"email": email}, one=True)
+    return row["password"]
+
+
+def test_needs_rehash():
+    assert pathwise.needs_rehash(generate_password_hash("pw", method=OLD_METHOD))
+    assert not pathwise.needs_rehash(pathwise.hash_password("pw"))
+
+
+def test_login_rehashes_old_format(client):
+    add_user("old@example.com", generate_password_hash("secret", method=OLD_METHOD))
+
+    resp = client.post("/login", data={"email": "old@example.com", "password": "secret"})
+
+    assert resp.status_code == 302 and resp.location.endswith("/dashboard")
+    new_hash = stored_hash("old@example.com")
+    assert pathwise._hash_params(new_hash) == pathwise.current_hash_params()
+    assert pathwise.check_password_hash(new_hash, "secret")
+
+
+def test_login_keeps_current_hash(client):
+    pwhash = pathwise.hash_password("secret")
+    add_user("new@example.com", pwhash)
+
+    resp = client.post("/login", data={"email": "new@example.com", "password": "secret"})
+
+    assert resp.location.endswith("/dashboard")
+    assert stored_hash("new@example.com") == pwhash
+
+
+def test_login_timeout_is_busy_and_cancels(client, monkeypatch):
+    add_user("busy@example.com", pathwise.hash_password("secret"))
+    monkeypatch.setattr(pathwise, "LOGIN_HASH_TIMEOUT", 0.05)
+
+    # Occupy every worker so the login check stays queued
+    release = threading.Event()
+    blockers = [pathwise._hash_pool.submit(release.wait) for _ in range(pathwise.LOGIN_HASH_WORKERS)]
+
+    submitted = []
+    real_submit = pathwise._hash_pool.submit
+    def spy_submit(*args, **kwargs):
+        fut = real_submit(*args, **kwargs)
+        submitted.append(fut)
+        return fut
+    monkeypatch.setattr(pathwise._hash_pool, "submit", spy_submit)
+
+    try:
+        resp = client.post("/login", data={"email": "busy@example.com", "password": "secret"})
+        with client.session_transaction() as sess:
+            flashes = [msg for _, msg in sess.get("_flashes", [])]
+    finally:
+        release.set()
+        for b in blockers:
+            b.result()
+
+    assert resp.location.endswith("/")
+    assert "Login is busy right now. Please try again." in flashes
+    assert len(submitted) == 1 and submitted[0].cancelled()
+
+
+def test_run_hash_job_fails_fast_when_queue_full(monkeypatch):
+    monkeypatch.setattr(pathwise, "_hash_slots", threading.BoundedSemaphore(1))
+    pathwise._hash_slots.acquire()
+
+    with pytest.raises(pathwise.FutureTimeout):
+        pathwise.run_hash_job(pathwise.hash_password, "pw")